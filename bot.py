@@ -3,17 +3,31 @@ Solana Wallet Connection Tracker - Telegram Bot
 Advanced on-chain analysis using ZachXBT/Chainalysis techniques.
 """
 
+import asyncio
+import io
 import re
 import logging
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Iterator
 from telegram import Update
+from telegram.error import BadRequest, NetworkError, RetryAfter
 from telegram.ext import (
     Application,
     CommandHandler,
     ContextTypes,
 )
-
-from config import TELEGRAM_BOT_TOKEN
-from wallet_analyzer import analyze_wallet, format_analysis_result
+from telegram.request import HTTPXRequest
+
+from config import TELEGRAM_BOT_TOKEN, MAX_CONCURRENT_ANALYSES
+from helius_client import helius_client
+from wallet_analyzer import (
+    _report_progress,
+    analyze_wallet_cached,
+    format_analysis_result,
+    get_cached_analysis,
+    is_analysis_running,
+)
 
 # Set up logging
 logging.basicConfig(
@@ -22,15 +36,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Bounds concurrent analyses across all /check handlers; extra requests queue
+ANALYSIS_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_ANALYSES)
+
 # Solana address regex (base58, 32-44 chars)
-SOLANA_ADDRESS_REGEX = re.compile(r"^[1-9A-HJ-NP-Za-km-z]{32,44}$")
+SOLANA_ADDRESS_REGEX = re.compile(r"[1-9A-HJ-NP-Za-km-z]{32,44}", re.ASCII)
+
+# Base58 alphabet (no 0, O, I, l) for a cheap pre-check before the regex
+BASE58_ALPHABET = frozenset("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz")
+
+# Display emoji for each connection signal
+SIGNAL_EMOJIS = {
+    "FUNDER": "💰",
+    "SAME_FUNDER": "👥",
+    "SAME_FUNDER_VIA": "👥",
+    "FEE_PAYER": "⛽",
+    "BIDIRECTIONAL": "↔️",
+    "HIGH_FREQ": "🔥",
+    "MED_FREQ": "📊",
+    "ROUND_AMT": "🎯",
+    "LARGE_XFER": "💎",
+    "TIMING": "⏰",
+    "COMMON_CP_HIGH": "🔗",
+    "COMMON_CP": "🔗",
+}
+
+# Static footer appended to every report
+SIGNAL_LEGEND = "\n".join([
+    "━━━━━━━━━━━━━━━━━━━━━━━━━━━",
+    "📖 **SIGNAL LEGEND:**",
+    "💰 Funder | 👥 Same Funder | ⛽ Fee Payer",
+    "↔️ Bidirectional | 🔥 High Freq | 🎯 Round Amt",
+    "💎 Large Transfer | ⏰ Timing Match | 🔗 Common CP",
+])
 
 
 def is_valid_solana_address(address: str) -> bool:
     """Validate Solana address format."""
-    return bool(SOLANA_ADDRESS_REGEX.match(address))
+    if not 32 <= len(address) <= 44:
+        return False
+    if not BASE58_ALPHABET.issuperset(address):
+        return False
+    return SOLANA_ADDRESS_REGEX.fullmatch(address) is not None
 
 
+@lru_cache(maxsize=4096)
 def truncate_address(address: str, chars: int = 4) -> str:
     """Truncate address for display."""
     return f"{address[:chars]}...{address[-chars:]}"
@@ -38,21 +88,8 @@ def truncate_address(address: str, chars: int = 4) -> str:
 
 def format_signals(signals: list[str]) -> str:
     """Format signal tags for display."""
-    signal_emojis = {
-        "FUNDER": "💰",
-        "SAME_FUNDER": "👥",
-        "SAME_FUNDER_VIA": "👥",
-        "FEE_PAYER": "⛽",
-        "BIDIRECTIONAL": "↔️",
-        "HIGH_FREQ": "🔥",
-        "MED_FREQ": "📊",
-        "ROUND_AMT": "🎯",
-        "LARGE_XFER": "💎",
-        "TIMING": "⏰",
-        "COMMON_CP_HIGH": "🔗",
-        "COMMON_CP": "🔗",
-    }
-    return " ".join(signal_emojis.get(s, f"[{s}]") for s in signals)
+    get = SIGNAL_EMOJIS.get
+    return " ".join([get(s) or f"[{s}]" for s in signals])
 
 
 def format_results(results: dict) -> str:
@@ -60,40 +97,48 @@ def format_results(results: dict) -> str:
     if "error" in results:
         return f"❌ Error: {results['error']}"
 
-    lines = [
-        "🔍 **WALLET ANALYSIS REPORT**",
-        f"━━━━━━━━━━━━━━━━━━━━━━━━━━━",
-        f"📍 Target: `{results['address']}`",
-        f"📊 Transactions analyzed: {results['transaction_count']}",
-        "",
-    ]
+    buf = io.StringIO()
+    w = buf.write
+
+    w("🔍 **WALLET ANALYSIS REPORT**\n")
+    w("━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
+    w(f"📍 Target: `{results['address']}`\n")
+    w(f"📊 Transactions analyzed: {results['transaction_count']}\n")
+    w("\n")
 
     # Funder information (highest priority)
     if results.get("funder"):
-        lines.append("💰 **FUNDING CHAIN:**")
-        lines.append(f"   └─ Funder: `{results['funder']}`")
+        w("💰 **FUNDING CHAIN:**\n")
+        w(f"   └─ Funder: `{results['funder']}`\n")
         if results.get("funder_of_funder"):
-            lines.append(f"      └─ Funder's Funder: `{truncate_address(results['funder_of_funder'], 6)}`")
-        lines.append("")
+            w(f"      └─ Funder's Funder: `{truncate_address(results['funder_of_funder'], 6)}`\n")
+        w("\n")
 
     # Same funder cluster (very high signal)
-    if results.get("same_funder_cluster"):
-        lines.append("👥 **SAME FUNDER CLUSTER** (likely same owner):")
-        for addr in results["same_funder_cluster"][:5]:
-            lines.append(f"   • `{addr}`")
-        if len(results["same_funder_cluster"]) > 5:
-            lines.append(f"   ... and {len(results['same_funder_cluster']) - 5} more")
-        lines.append("")
+    cluster = results.get("same_funder_cluster")
+    if cluster:
+        w("👥 **SAME FUNDER CLUSTER** (likely same owner):\n")
+        for addr in cluster[:5]:
+            w(f"   • `{addr}`\n")
+        if len(cluster) > 5:
+            w(f"   ... and {len(cluster) - 5} more\n")
+        w("\n")
 
     # Direct connections (Hop 1)
     direct = results.get("direct_connections", [])
     if direct:
-        lines.append("🎯 **DIRECT CONNECTIONS (Hop 1):**")
-        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        w("🎯 **DIRECT CONNECTIONS (Hop 1):**\n")
+        w("━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
 
         for i, conn in enumerate(direct[:12], 1):
+            get = conn.get
             score = conn["score"]
-            signals = format_signals(conn.get("signals", []))
+            signals = format_signals(get("signals", []))
+            sent_sol = get("sent_sol", 0)
+            received_sol = get("received_sol", 0)
+            sent_usd = get("sent_usd", 0)
+            received_usd = get("received_usd", 0)
+            total_val = get("total_value_usd", 0)
 
             # Score indicator
             if score >= 100:
@@ -105,78 +150,121 @@ def format_results(results: dict) -> str:
             else:
                 score_icon = "⚪"  # Weak connection
 
-            lines.append(f"{score_icon} **#{i}** Score: {score}")
-            lines.append(f"   `{conn['address']}`")
+            w(f"{score_icon} **#{i}** Score: {score}\n")
+            w(f"   `{conn['address']}`\n")
 
             if signals:
-                lines.append(f"   {signals}")
+                w(f"   {signals}\n")
 
             # Transaction details
             details = []
-            if conn.get("sent_sol", 0) > 0:
-                details.append(f"sent {conn['sent_sol']} SOL")
-            if conn.get("received_sol", 0) > 0:
-                details.append(f"recv {conn['received_sol']} SOL")
-            if conn.get("sent_usd", 0) > 0:
-                details.append(f"sent ${conn['sent_usd']}")
-            if conn.get("received_usd", 0) > 0:
-                details.append(f"recv ${conn['received_usd']}")
+            if sent_sol > 0:
+                details.append(f"sent {sent_sol} SOL")
+            if received_sol > 0:
+                details.append(f"recv {received_sol} SOL")
+            if sent_usd > 0:
+                details.append(f"sent ${sent_usd}")
+            if received_usd > 0:
+                details.append(f"recv ${received_usd}")
             if details:
-                lines.append(f"   💵 {', '.join(details)}")
+                w(f"   💵 {', '.join(details)}\n")
             # Show total value
-            total_val = conn.get("total_value_usd", 0)
             if total_val > 0:
-                lines.append(f"   💰 Total: ~${total_val:,.0f}")
+                w(f"   💰 Total: ~${total_val:,.0f}\n")
 
-            lines.append("")
+            w("\n")
 
     else:
-        lines.append("No direct connections found.")
-        lines.append("")
+        w("No direct connections found.\n")
+        w("\n")
 
     # Bidirectional cluster
     if results.get("bidirectional_cluster"):
-        lines.append("↔️ **BIDIRECTIONAL TRANSFERS** (strong signal):")
+        w("↔️ **BIDIRECTIONAL TRANSFERS** (strong signal):\n")
         for addr in results["bidirectional_cluster"][:5]:
-            lines.append(f"   • `{truncate_address(addr, 6)}`")
-        lines.append("")
+            w(f"   • `{truncate_address(addr, 6)}`\n")
+        w("\n")
 
     # Hop 2 connections
     hop2 = results.get("hop2_connections", [])
     if hop2:
-        lines.append("🔗 **SECONDARY CONNECTIONS (Hop 2):**")
-        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        w("🔗 **SECONDARY CONNECTIONS (Hop 2):**\n")
+        w("━━━━━━━━━━━━━━━━━━━━━━━━━━━\n")
 
         for i, conn in enumerate(hop2[:8], 1):
             score = conn["score"]
             via = conn.get("connected_via", [])
             common_cp = conn.get("common_counterparties", 0)
 
-            lines.append(f"**#{i}** Score: {round(score, 1)}")
-            lines.append(f"   `{conn['address']}`")
+            w(f"**#{i}** Score: {round(score, 1)}\n")
+            w(f"   `{conn['address']}`\n")
 
             if via:
                 via_str = ", ".join(truncate_address(v, 4) for v in via[:2])
-                lines.append(f"   via: {via_str}")
+                w(f"   via: {via_str}\n")
 
             if common_cp > 0:
-                lines.append(f"   🔗 {common_cp} common counterparties")
+                w(f"   🔗 {common_cp} common counterparties\n")
 
-            lines.append("")
+            w("\n")
 
     # Legend
-    lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-    lines.append("📖 **SIGNAL LEGEND:**")
-    lines.append("💰 Funder | 👥 Same Funder | ⛽ Fee Payer")
-    lines.append("↔️ Bidirectional | 🔥 High Freq | 🎯 Round Amt")
-    lines.append("💎 Large Transfer | ⏰ Timing Match | 🔗 Common CP")
-
-    return "\n".join(lines)
-
-
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /start command."""
-    welcome_text = """
+    w(SIGNAL_LEGEND)
+
+    return buf.getvalue()
+
+
+def iter_message_chunks(text: str, limit: int = 4000) -> Iterator[str]:
+    """Yield chunks of at most `limit` chars, breaking on newlines."""
+    i, n = 0, len(text)
+    while i < n:
+        end = min(i + limit, n)
+        if end < n:
+            cut = text.rfind("\n", i, end)
+            if cut > i:
+                yield text[i:cut]
+                i = cut + 1
+                continue
+        yield text[i:end]
+        i = end
+
+
+async def retry_telegram(
+    send: Callable[..., Awaitable[Any]],
+    *args,
+    attempts: int = 3,
+    backoff: float = 0.2,
+    retry_timeouts: bool = True,
+    **kwargs,
+) -> Any:
+    """
+    Call a Telegram API method, retrying transient network failures.
+    Pass retry_timeouts=False for sends that must not be repeated (new
+    messages): a request that failed in transit may still have been delivered.
+    """
+    for attempt in range(attempts):
+        last = attempt == attempts - 1
+        try:
+            return await send(*args, **kwargs)
+        except BadRequest as e:
+            # An earlier attempt that timed out may have applied the edit after all
+            if attempt > 0 and "not modified" in e.message.lower():
+                return None
+            raise  # Permanent: bad Markdown, message not found, ...
+        except RetryAfter as e:
+            if last:
+                raise
+            delay = e.retry_after
+            if isinstance(delay, timedelta):
+                delay = delay.total_seconds()
+            await asyncio.sleep(delay)
+        except NetworkError:
+            if last or not retry_timeouts:
+                raise
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+
+START_TEXT = """
 🔍 **Solana Wallet Connection Tracker**
 
 Advanced on-chain analysis to find wallets potentially belonging to the same person.
@@ -201,12 +289,9 @@ Advanced on-chain analysis to find wallets potentially belonging to the same per
 
 Send `/check` followed by any Solana wallet address to start!
     """
-    await update.message.reply_text(welcome_text, parse_mode="Markdown")
 
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Handle /help command."""
-    help_text = """
+HELP_TEXT = """
 🔍 **WALLET ANALYZER HELP**
 
 **Usage:**
@@ -251,7 +336,20 @@ Round number transfers suggest intentional movement.
 **Filtered Out:**
 CEXs, DEXs, LPs, protocols, system programs, bridges, NFT marketplaces
     """
-    await update.message.reply_text(help_text, parse_mode="Markdown")
+
+
+async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /start command."""
+    await update.message.reply_text(
+        START_TEXT, parse_mode="Markdown", disable_web_page_preview=True
+    )
+
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /help command."""
+    await update.message.reply_text(
+        HELP_TEXT, parse_mode="Markdown", disable_web_page_preview=True
+    )
 
 
 async def check_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -273,64 +371,131 @@ async def check_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         return
 
-    # Send initial message
-    status_msg = await update.message.reply_text(
-        f"🔍 Analyzing wallet...\n"
-        f"`{truncate_address(address, 8)}`\n\n"
-        f"⏳ Fetching transactions...",
-        parse_mode="Markdown",
-    )
-
-    try:
-        # Update status
-        await status_msg.edit_text(
-            f"🔍 Analyzing wallet...\n"
-            f"`{truncate_address(address, 8)}`\n\n"
-            f"⏳ Processing hop-1 connections...",
-            parse_mode="Markdown",
+    # Recent results are served straight away, without queueing
+    result = get_cached_analysis(address)
+    status_msg = None
+
+    # Progress edits run in the background; the lock and flag keep a late one
+    # from overwriting the final report
+    edit_lock = asyncio.Lock()
+    finished = False
+
+    if result is None:
+        # Joining a running analysis of this address skips the queue
+        queued = ANALYSIS_SEMAPHORE.locked() and not is_analysis_running(address)
+
+        # Send initial message while the analysis starts fetching
+        status_task = asyncio.create_task(
+            update.message.reply_text(
+                f"🔍 Analyzing wallet...\n"
+                f"`{truncate_address(address, 8)}`\n\n"
+                f"⏳ {'Waiting in queue...' if queued else 'Fetching transactions...'}",
+                parse_mode="Markdown",
+            )
         )
 
+        async def report_progress(stage: str):
+            try:
+                status_msg = await status_task
+                async with edit_lock:
+                    if finished:
+                        return
+                    await retry_telegram(
+                        status_msg.edit_text,
+                        f"🔍 Analyzing wallet...\n"
+                        f"`{truncate_address(address, 8)}`\n\n"
+                        f"⏳ {stage}",
+                        parse_mode="Markdown",
+                    )
+            except Exception as e:
+                logger.debug("Progress update failed for %s: %s", address, e)
+
+        async def run_analysis():
+            if is_analysis_running(address):
+                # Only waits on the shared run, so don't take an analysis slot
+                return await analyze_wallet_cached(address, progress_cb=report_progress)
+            async with ANALYSIS_SEMAPHORE:
+                if queued:
+                    # Don't hold the analysis slot while Telegram is slow
+                    _report_progress(report_progress, "Fetching transactions...")
+                return await analyze_wallet_cached(address, progress_cb=report_progress)
+
         # Run analysis
-        result = await analyze_wallet(address)
+        analyze_task = asyncio.create_task(run_analysis())
+
+        try:
+            status_msg = await status_task
+        except Exception as e:
+            logger.warning("Failed to send status message for %s: %s", address, e)
+
+    async def show(text: str):
+        """Replace the status message, or reply if it could not be sent."""
+        nonlocal finished
+        async with edit_lock:
+            finished = True
+            if status_msg:
+                await retry_telegram(status_msg.edit_text, text, parse_mode="Markdown")
+            else:
+                await retry_telegram(
+                    update.message.reply_text,
+                    text,
+                    parse_mode="Markdown",
+                    retry_timeouts=False,
+                )
+
+    try:
+        if result is None:
+            result = await analyze_task
         formatted_result = format_analysis_result(result)
         formatted_text = format_results(formatted_result)
 
         # Split message if too long (Telegram limit is 4096 chars)
-        if len(formatted_text) > 4000:
-            parts = []
-            current_part = ""
-            for line in formatted_text.split("\n"):
-                if len(current_part) + len(line) + 1 > 4000:
-                    parts.append(current_part)
-                    current_part = line
-                else:
-                    current_part += "\n" + line if current_part else line
-            if current_part:
-                parts.append(current_part)
-
-            await status_msg.edit_text(parts[0], parse_mode="Markdown")
-            for part in parts[1:]:
-                await update.message.reply_text(part, parse_mode="Markdown")
-        else:
-            await status_msg.edit_text(formatted_text, parse_mode="Markdown")
+        for i, chunk in enumerate(iter_message_chunks(formatted_text)):
+            if i == 0:
+                await show(chunk)
+            else:
+                await retry_telegram(
+                    update.message.reply_text,
+                    chunk,
+                    parse_mode="Markdown",
+                    retry_timeouts=False,
+                )
 
     except Exception as e:
-        logger.error(f"Error analyzing wallet {address}: {e}")
-        await status_msg.edit_text(
-            f"❌ An error occurred while analyzing the wallet:\n`{str(e)}`",
-            parse_mode="Markdown",
-        )
+        logger.error("Error analyzing wallet %s: %s", address, e)
+        await show(f"❌ An error occurred while analyzing the wallet:\n`{str(e)}`")
+
+
+async def post_shutdown(app: Application):
+    """Release shared HTTP clients when the bot stops."""
+    await helius_client.aclose()
 
 
 async def error_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle errors."""
-    logger.error(f"Update {update} caused error {context.error}")
+    logger.error("Update %s caused error %s", update, context.error)
 
 
 def main():
     """Run the bot."""
+    # Use uvloop's faster event loop where available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     # Create application
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    # HTTP/2 lets concurrent replies/edits share one keep-alive connection
+    request = HTTPXRequest(http_version="2", connection_pool_size=20)
+    app = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .request(request)
+        .concurrent_updates(True)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Add handlers
     app.add_handler(CommandHandler("start", start_command))
@@ -21,6 +21,12 @@ HOP2_TRANSACTION_LIMIT = 100  # Keep lower for hop2 (many wallets)
 MAX_HOP1_WALLETS = 30
 MAX_HOP2_WALLETS = 15
 MAX_CONCURRENT_REQUESTS = 5  # Reduced to avoid rate limits
+HELIUS_REQUESTS_PER_SECOND = 10  # Token bucket rate for Helius calls
+MAX_CONCURRENT_ANALYSES = 3  # Max /check analyses running at once
+ANALYSIS_CACHE_TTL = 300  # Seconds to reuse a finished analysis
+ANALYSIS_CACHE_SIZE = 1024  # Max cached analysis results
+HISTORY_CACHE_TTL = 300  # Seconds to reuse a fetched transaction history page
+HISTORY_CACHE_MAX_TRANSACTIONS = 2000  # Max cached history transactions (~20 full pages)
 
 # Spam/dust filtering thresholds
 MIN_SOL_THRESHOLD = 0.5  # Minimum SOL value to consider (~$100 at $200/SOL)
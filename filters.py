@@ -3,6 +3,13 @@ Comprehensive address filtering for Solana wallet analysis.
 Excludes CEXs, DEXs, LPs, protocols, system programs, and known entities.
 """
 
+import logging
+import re
+from functools import lru_cache
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # CENTRALIZED EXCHANGES (CEX)
 # ============================================================================
@@ -12,7 +19,6 @@ CEX_ADDRESSES = {
     "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM": "Binance",
     "2ojv9BAiHUrvsm9gxDe7fJSzbNZSJcxZvf8dqmWGHG8S": "Binance",
     "CVJVpeanE2Z96qEMjyFNrQe4MHH9FQMDWyQH4K3Vuqua": "Binance",
-    "AC5RDfQFmDS1deWZos921JfqscXdByf8BKHs5ACWjtW2": "Binance",
     "9un5wqE3q4oCjyrDkwsdD48KteCJitQX5978Vh7KKxHo": "Binance",
     "HNAafKrJziFbqkCYMTFBXwhfVcAr6c2jPCdscNBnHHZP": "Binance",
     "7LbpuNPFwYyFVPGYzgPPWMJj8JcQzU9X7xWM5gqZ8xwM": "Binance",
@@ -20,7 +26,6 @@ CEX_ADDRESSES = {
     "H8sMJSCQxfKiFTCfDR3DUMLPwcRbM61LGFJ8N4dK3WjS": "Coinbase",
     "GJRs4FwHtemZ5ZE9x3FNvJ8TMwitKTh21yxdRPqn7npE": "Coinbase",
     "2AQdpHJ2JpcEgPiATUXjQxA8QmafFegfQwSLWSprPicm": "Coinbase",
-    "5VCwKtCXgCJ6kit5FybXjvriW3xELsFDhYrPSqtJNmcD": "Coinbase",
     # Kraken
     "6FEVkH17P9y8Q9aCkDdPcMDjvj7SVxrTETaYEm8f51S2": "Kraken",
     "CQfcwJwPjpKfgBTW8h1cHfU4VPHFJXVvRXNvyF6FLKAZ": "Kraken",
@@ -30,7 +35,6 @@ CEX_ADDRESSES = {
     "5VCwKtCXgCJ6kit5FybXjvriW3xELsFDhYrPSqtJNmcD": "OKX",
     "6Gmfq1YpEjRghEjfuYgqnVqjS4eCb8XwGYNBuDGskmQN": "OKX",
     # Bybit
-    "u6PJ8DtQuPFnfmwHbGFULQ4u4EgjDiyYKjVEsynXq2w": "Bybit",
     "AC5RDfQFmDS1deWZos921JfqscXdByf8BKHs5ACWjtW2": "Bybit",
     # Gate.io
     "BmFdpraQhkiDQE6SnfG5omcA1VwzqfXrwtNYBwWTymy6": "Gate.io",
@@ -203,17 +207,36 @@ SPAM_TOKEN_MINTS = {
     # Add more spam token mints here
 }
 
+
+def _merge_labels(*label_dicts: dict[str, str]) -> dict[str, str]:
+    """Merge address label dicts, warning when one address has two labels."""
+    merged: dict[str, str] = {}
+    for labels in label_dicts:
+        for address, label in labels.items():
+            existing = merged.get(address)
+            if existing is not None and existing != label:
+                logger.warning(
+                    "Conflicting labels for %s: %s vs %s", address, existing, label
+                )
+            merged[address] = label
+    return merged
+
+
 # Combine all excluded addresses
-EXCLUDED_ADDRESSES = {
-    **CEX_ADDRESSES,
-    **DEX_PROGRAMS,
-    **NFT_PROGRAMS,
-    **DEFI_PROGRAMS,
-    **SYSTEM_PROGRAMS,
-    **BRIDGE_PROGRAMS,
-    **BOT_ADDRESSES,
-    **SPAM_ADDRESSES,
-}
+EXCLUDED_ADDRESSES = _merge_labels(
+    CEX_ADDRESSES,
+    DEX_PROGRAMS,
+    NFT_PROGRAMS,
+    DEFI_PROGRAMS,
+    SYSTEM_PROGRAMS,
+    BRIDGE_PROGRAMS,
+    BOT_ADDRESSES,
+    SPAM_ADDRESSES,
+)
+
+# Frozen views of EXCLUDED_ADDRESSES / CEX_ADDRESSES for membership checks
+EXCLUDED_ADDRESS_SET = frozenset(EXCLUDED_ADDRESSES)
+CEX_ADDRESS_SET = frozenset(CEX_ADDRESSES)
 
 # Patterns in labels that indicate exclusion
 EXCLUDED_LABEL_PATTERNS = [
@@ -227,6 +250,11 @@ EXCLUDED_LABEL_PATTERNS = [
     "casino", "gambling", "lottery", "giveaway", "dust",
 ]
 
+# All label patterns as one alternation, so a label is scanned once
+EXCLUDED_LABEL_REGEX = re.compile(
+    "|".join(map(re.escape, EXCLUDED_LABEL_PATTERNS)), re.IGNORECASE | re.ASCII
+)
+
 # Address substrings that indicate spam (case insensitive check)
 SPAM_ADDRESS_PATTERNS = [
     "flip",
@@ -238,26 +266,27 @@ SPAM_ADDRESS_PATTERNS = [
     "pump",  # PumpFun tokens often spam
 ]
 
+SPAM_ADDRESS_REGEX = re.compile(
+    "|".join(map(re.escape, SPAM_ADDRESS_PATTERNS)), re.IGNORECASE | re.ASCII
+)
+
 # Known program ID prefixes (programs often start with these)
-PROGRAM_PREFIXES = [
+PROGRAM_PREFIXES = (
     "1111111111",  # System-like
     "So1",  # Solana protocols
     "Token",  # Token programs
-]
+)
 
 
 def is_spam_address(address: str) -> bool:
     """Check if address looks like spam based on patterns."""
-    addr_lower = address.lower()
-    for pattern in SPAM_ADDRESS_PATTERNS:
-        if pattern in addr_lower:
-            return True
-    return False
+    return SPAM_ADDRESS_REGEX.search(address) is not None
 
 
+@lru_cache(maxsize=65536)
 def is_excluded_address(address: str) -> bool:
     """Check if address should be excluded from analysis."""
-    if address in EXCLUDED_ADDRESSES:
+    if address in EXCLUDED_ADDRESS_SET:
         return True
     if is_spam_address(address):
         return True
@@ -269,40 +298,45 @@ def get_exclusion_reason(address: str) -> str | None:
     return EXCLUDED_ADDRESSES.get(address)
 
 
+@lru_cache(maxsize=65536)
 def is_likely_program(address: str) -> bool:
     """Heuristic check if address is likely a program."""
-    if address in EXCLUDED_ADDRESSES:
+    if address in EXCLUDED_ADDRESS_SET:
+        return True
+    if address.startswith(PROGRAM_PREFIXES):
         return True
-    for prefix in PROGRAM_PREFIXES:
-        if address.startswith(prefix):
-            return True
     # Programs often have many 1s in them
     if address.count("1") > 10:
         return True
     return False
 
 
+@lru_cache(maxsize=65536)
 def is_excluded_by_label(label: str | None) -> bool:
     """Check if a label indicates the address should be excluded."""
-    if not label:
-        return False
-    label_lower = label.lower()
-    return any(pattern in label_lower for pattern in EXCLUDED_LABEL_PATTERNS)
+    return bool(label) and EXCLUDED_LABEL_REGEX.search(label) is not None
 
 
 def filter_addresses(addresses: dict[str, dict]) -> dict[str, dict]:
     """Filter out excluded addresses."""
-    filtered = {}
-    for addr, data in addresses.items():
-        if is_excluded_address(addr):
-            continue
-        if is_likely_program(addr):
-            continue
-        label = data.get("label", "")
-        if is_excluded_by_label(label):
-            continue
-        filtered[addr] = data
-    return filtered
+    return {
+        addr: data
+        for addr, data in addresses.items()
+        if not (
+            is_excluded_address(addr)
+            or is_likely_program(addr)
+            or is_excluded_by_label(data.get("label"))
+        )
+    }
+
+
+def filter_addresses_set(addresses: Iterable[str]) -> set[str]:
+    """Filter out excluded addresses from unlabeled addresses."""
+    return {
+        addr
+        for addr in addresses
+        if not (is_excluded_address(addr) or is_likely_program(addr))
+    }
 
 
 def get_cex_name(address: str) -> str | None:
@@ -312,4 +346,4 @@ def get_cex_name(address: str) -> str | None:
 
 def is_cex_address(address: str) -> bool:
     """Check if address is a known CEX address."""
-    return address in CEX_ADDRESSES
+    return address in CEX_ADDRESS_SET
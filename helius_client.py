@@ -4,9 +4,45 @@ Supports transaction history, parsed transactions, and signatures.
 """
 
 import asyncio
+import logging
+import time
 import httpx
+import orjson
+from collections import OrderedDict
 from typing import Any
-from config import HELIUS_API_KEY, HELIUS_BASE_URL, HELIUS_RPC_URL, MAX_CONCURRENT_REQUESTS
+from config import (
+    HELIUS_API_KEY,
+    HELIUS_BASE_URL,
+    HELIUS_RPC_URL,
+    MAX_CONCURRENT_REQUESTS,
+    HELIUS_REQUESTS_PER_SECOND,
+    HISTORY_CACHE_TTL,
+    HISTORY_CACHE_MAX_TRANSACTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Async token bucket allowing bursts of up to `rate` calls per `period`."""
+
+    def __init__(self, rate: float, period: float = 1.0):
+        self._capacity = rate
+        self._fill_rate = rate / period
+        self._tokens = rate
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        """Take a token, sleeping until one is available."""
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._updated) * self._fill_rate
+        )
+        self._updated = now
+        # Going negative reserves a future token; sleep until it refills
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self._fill_rate)
 
 
 class HeliusClient:
@@ -17,6 +53,26 @@ class HeliusClient:
         self.base_url = HELIUS_BASE_URL
         self.rpc_url = HELIUS_RPC_URL
         self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._limiter = RateLimiter(HELIUS_REQUESTS_PER_SECOND)
+        # One pooled client so TCP/TLS connections are reused across requests
+        self._client = httpx.AsyncClient(
+            timeout=30.0,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=MAX_CONCURRENT_REQUESTS * 2,
+                max_keepalive_connections=MAX_CONCURRENT_REQUESTS,
+            ),
+        )
+        # Latest history page by address: address -> (expires_at, limit, transactions)
+        self._history_cache: OrderedDict[str, tuple[float, int, list[dict]]] = OrderedDict()
+        # Parsed transaction dicts held by the cache, the bound that tracks memory
+        self._history_cache_size = 0
+        # Latest-page fetches in progress: address -> (limit, task)
+        self._history_inflight: dict[str, tuple[int, asyncio.Task]] = {}
+
+    async def aclose(self):
+        """Close the underlying HTTP connection pool."""
+        await self._client.aclose()
 
     async def _request(
         self,
@@ -27,14 +83,31 @@ class HeliusClient:
         timeout: float = 30.0,
     ) -> Any:
         """Make rate-limited HTTP request."""
+        kwargs: dict[str, Any] = {}
+        if method != "GET":
+            kwargs["content"] = orjson.dumps(json_data)
+            kwargs["headers"] = {"content-type": "application/json"}
+
+        await self._limiter.acquire()
         async with self._semaphore:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                if method == "GET":
-                    response = await client.get(url, params=params)
-                else:
-                    response = await client.post(url, params=params, json=json_data)
+            # Stream the (decoded) body into one buffer that orjson parses directly
+            async with self._client.stream(
+                method, url, params=params, timeout=timeout, **kwargs
+            ) as response:
                 response.raise_for_status()
-                return response.json()
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+        return orjson.loads(body)
+
+    async def _rpc(self, method: str, params: list) -> Any:
+        """Make a JSON-RPC call to the Helius RPC endpoint and return its result."""
+        payload = {"jsonrpc": "2.0", "id": 1, "method": method, "params": params}
+        response = await self._request("POST", self.rpc_url, json_data=payload)
+        # JSON-RPC errors arrive as HTTP 200 with an "error" member instead of a result
+        if "error" in response:
+            raise RuntimeError(f"{method} failed: {response['error']}")
+        return response.get("result")
 
     async def get_transaction_history(
         self,
@@ -45,11 +118,47 @@ class HeliusClient:
         """
         Fetch parsed transaction history using Helius Enhanced Transactions API.
         Returns enriched transaction data with parsed instructions.
+        The latest page (no `before` cursor) is cached briefly per address,
+        and concurrent requests for it share a single fetch.
         """
+        limit = min(limit, 100)
+        if before:
+            return await self._fetch_transaction_history(address, limit, before)
+
+        cached = self._get_cached_history(address, limit)
+        if cached is not None:
+            return cached
+
+        inflight = self._history_inflight.get(address)
+        if inflight is not None and inflight[0] >= limit:
+            transactions = await asyncio.shield(inflight[1])
+            return transactions[:limit]
+
+        task = asyncio.create_task(self._fetch_transaction_history(address, limit))
+        self._history_inflight[address] = (limit, task)
+
+        def _done(t: asyncio.Task):
+            if self._history_inflight.get(address, (0, None))[1] is t:
+                del self._history_inflight[address]
+            if not t.cancelled() and t.exception() is None:
+                self._cache_history(address, limit, t.result())
+
+        task.add_done_callback(_done)
+
+        # Shield so one caller giving up doesn't cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def _fetch_transaction_history(
+        self,
+        address: str,
+        limit: int,
+        before: str | None = None,
+    ) -> list[dict]:
+        """Request one page of enhanced transactions, retrying once on 429."""
         url = f"{self.base_url}/addresses/{address}/transactions"
         params = {
             "api-key": self.api_key,
-            "limit": min(limit, 100),
+            "limit": limit,
         }
         if before:
             params["before"] = before
@@ -62,6 +171,38 @@ class HeliusClient:
                 return await self._request("GET", url, params=params)
             raise
 
+    def _get_cached_history(self, address: str, limit: int) -> list[dict] | None:
+        """Serve the latest `limit` transactions from a fresh cached page, if any."""
+        entry = self._history_cache.get(address)
+        if entry is None:
+            return None
+        expires_at, cached_limit, transactions = entry
+        if expires_at <= time.monotonic():
+            del self._history_cache[address]
+            self._history_cache_size -= len(transactions)
+            return None
+        # A short page means the address has no more history to fetch
+        if cached_limit < limit and len(transactions) >= cached_limit:
+            return None
+        self._history_cache.move_to_end(address)
+        return transactions[:limit]
+
+    def _cache_history(self, address: str, limit: int, transactions: list[dict]):
+        """Store a latest-history page, keeping the largest one per address."""
+        entry = self._history_cache.get(address)
+        if entry is not None:
+            if entry[1] > limit and entry[0] > time.monotonic():
+                return
+            self._history_cache_size -= len(entry[2])
+        self._history_cache[address] = (
+            time.monotonic() + HISTORY_CACHE_TTL, limit, transactions
+        )
+        self._history_cache.move_to_end(address)
+        self._history_cache_size += len(transactions)
+        while self._history_cache_size > HISTORY_CACHE_MAX_TRANSACTIONS:
+            _, (_, _, evicted) = self._history_cache.popitem(last=False)
+            self._history_cache_size -= len(evicted)
+
     async def get_all_transaction_history(
         self,
         address: str,
@@ -69,28 +210,75 @@ class HeliusClient:
     ) -> list[dict]:
         """
         Fetch multiple pages of transaction history.
+        Once the first page comes back full, page cursors come from
+        getSignaturesForAddress so the later pages are fetched concurrently.
+        If that RPC call fails, or its signatures run out before the history
+        does, the remaining pages are followed one cursor at a time.
         """
-        all_transactions = []
-        before = None
+        first_page = await self.get_transaction_history(
+            address, limit=min(max_transactions, 100)
+        )
+        if max_transactions <= 100 or len(first_page) < 100:
+            return first_page
 
-        while len(all_transactions) < max_transactions:
-            batch = await self.get_transaction_history(
-                address,
-                limit=100,
-                before=before,
+        try:
+            signatures = await self.get_signatures_for_address(
+                address, limit=min(max_transactions, 1000)
             )
-            if not batch:
-                break
+        except Exception as e:
+            logger.debug("getSignaturesForAddress failed for %s: %r", address, e)
+            signatures = []
 
-            all_transactions.extend(batch)
+        # Each later page starts after the last signature of the page before
+        # it, and asks for exactly as many transactions as are still needed
+        pages = list(await asyncio.gather(*(
+            self.get_transaction_history(
+                address,
+                limit=min(100, max_transactions - start),
+                before=signatures[start - 1]["signature"],
+            )
+            for start in range(100, min(len(signatures), max_transactions), 100)
+        )))
+        pages += await self._follow_transaction_pages(
+            address,
+            pages[-1] if pages else first_page,
+            len(first_page) + sum(map(len, pages)),
+            max_transactions,
+        )
 
-            if len(batch) < 100:
-                break
+        # Pages can overlap if the enhanced API skips some signatures
+        all_transactions = []
+        seen: set[str] = set()
+        for page in (first_page, *pages):
+            for tx in page:
+                signature = tx.get("signature")
+                if signature in seen:
+                    continue
+                seen.add(signature)
+                all_transactions.append(tx)
 
-            before = batch[-1].get("signature")
-            await asyncio.sleep(0.1)  # Rate limit
+        return all_transactions
 
-        return all_transactions[:max_transactions]
+    async def _follow_transaction_pages(
+        self,
+        address: str,
+        last_page: list[dict],
+        fetched: int,
+        max_transactions: int,
+    ) -> list[list[dict]]:
+        """Fetch the pages after last_page sequentially, cursoring on its last signature."""
+        pages = []
+        while fetched < max_transactions and len(last_page) == 100:
+            last_page = await self.get_transaction_history(
+                address,
+                limit=min(100, max_transactions - fetched),
+                before=last_page[-1]["signature"],
+            )
+            if not last_page:
+                break
+            pages.append(last_page)
+            fetched += len(last_page)
+        return pages
 
     async def get_signatures_for_address(
         self,
@@ -100,68 +288,56 @@ class HeliusClient:
         """
         Get transaction signatures for an address using RPC.
         """
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getSignaturesForAddress",
-            "params": [
-                address,
-                {"limit": limit}
-            ]
-        }
-
-        result = await self._request("POST", self.rpc_url, json_data=payload)
-        return result.get("result", [])
+        result = await self._rpc("getSignaturesForAddress", [address, {"limit": limit}])
+        return result or []
 
     async def get_parsed_transaction(self, signature: str) -> dict | None:
         """
         Get parsed transaction details for a specific signature.
         """
-        url = f"{self.base_url}/transactions"
-        params = {"api-key": self.api_key}
-        payload = {"transactions": [signature]}
-
-        try:
-            result = await self._request("POST", url, params=params, json_data=payload)
-            return result[0] if result else None
-        except Exception:
-            return None
+        result = await self.get_parsed_transactions([signature])
+        return result[0] if result else None
 
     async def get_parsed_transactions(self, signatures: list[str]) -> list[dict]:
         """
         Get parsed transaction details for multiple signatures.
-        Max 100 per request.
+        Sent in batches of 100 (the API maximum), fetched concurrently under
+        the client's request limits. A failed batch is skipped, so the result
+        may be partial.
         """
         if not signatures:
             return []
 
         url = f"{self.base_url}/transactions"
         params = {"api-key": self.api_key}
-        payload = {"transactions": signatures[:100]}
+        batches = [signatures[i:i + 100] for i in range(0, len(signatures), 100)]
 
-        try:
-            return await self._request("POST", url, params=params, json_data=payload)
-        except Exception:
-            return []
+        results = await asyncio.gather(*(
+            self._request("POST", url, params=params, json_data={"transactions": batch})
+            for batch in batches
+        ), return_exceptions=True)
+
+        transactions = []
+        for batch, result in zip(batches, results):
+            if isinstance(result, BaseException):
+                logger.debug(
+                    "Parsing %d transactions failed: %r", len(batch), result
+                )
+                continue
+            transactions.extend(result)
+        return transactions
 
     async def get_token_accounts(self, address: str) -> list[dict]:
         """
         Get all token accounts owned by an address.
         """
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getTokenAccountsByOwner",
-            "params": [
+        try:
+            result = await self._rpc("getTokenAccountsByOwner", [
                 address,
                 {"programId": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"},
-                {"encoding": "jsonParsed"}
-            ]
-        }
-
-        try:
-            result = await self._request("POST", self.rpc_url, json_data=payload)
-            return result.get("result", {}).get("value", [])
+                {"encoding": "jsonParsed"},
+            ])
+            return (result or {}).get("value", [])
         except Exception:
             return []
 
@@ -169,19 +345,9 @@ class HeliusClient:
         """
         Get account info for an address.
         """
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getAccountInfo",
-            "params": [
-                address,
-                {"encoding": "jsonParsed"}
-            ]
-        }
-
         try:
-            result = await self._request("POST", self.rpc_url, json_data=payload)
-            return result.get("result", {}).get("value")
+            result = await self._rpc("getAccountInfo", [address, {"encoding": "jsonParsed"}])
+            return (result or {}).get("value")
         except Exception:
             return None
 
@@ -189,16 +355,9 @@ class HeliusClient:
         """
         Get SOL balance in lamports.
         """
-        payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getBalance",
-            "params": [address]
-        }
-
         try:
-            result = await self._request("POST", self.rpc_url, json_data=payload)
-            return result.get("result", {}).get("value", 0)
+            result = await self._rpc("getBalance", [address])
+            return (result or {}).get("value", 0)
         except Exception:
             return 0
 
@@ -4,12 +4,16 @@ Implements techniques from ZachXBT, Chainalysis, and Bubblemaps.
 """
 
 import asyncio
-from collections import defaultdict
+import heapq
+import logging
+import time
+from collections import OrderedDict
 from dataclasses import dataclass, field
-from typing import Any
+from operator import attrgetter
+from typing import Any, Awaitable, Callable
 from helius_client import helius_client
 from filters import (
-    filter_addresses,
+    filter_addresses_set,
     is_excluded_address,
     is_cex_address,
     get_cex_name,
@@ -22,8 +26,12 @@ from config import (
     MAX_HOP2_WALLETS,
     MIN_SOL_THRESHOLD,
     DUST_THRESHOLD,
+    ANALYSIS_CACHE_TTL,
+    ANALYSIS_CACHE_SIZE,
 )
 
+logger = logging.getLogger(__name__)
+
 
 # Known stablecoin mints (USDC, USDT, etc.)
 STABLECOIN_MINTS = {
@@ -32,9 +40,13 @@ STABLECOIN_MINTS = {
     "USDH1SM1ojwWUga67PGrgFWUHibbjqMvuMaDkRJTgkX": "USDH",
     "USDSwr9ApdHk5bvJKMjzff41FfuX8bSxdKcR81vTwcA": "USDS",
 }
+STABLECOIN_MINT_SET = frozenset(STABLECOIN_MINTS)
 
+# SOL amounts that look like deliberate, hand-typed transfers
+ROUND_NUMBERS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
 
-@dataclass
+
+@dataclass(slots=True)
 class WalletConnection:
     """Represents a connection to another wallet with scoring details."""
     address: str
@@ -46,13 +58,15 @@ class WalletConnection:
     received_count: int = 0
     sent_sol: float = 0.0
     received_sol: float = 0.0
+    sent_lamports: int = 0  # Exact native totals; *_sol is derived from these
+    received_lamports: int = 0
     sent_usd: float = 0.0  # USD value from stablecoins
     received_usd: float = 0.0  # USD value from stablecoins
 
     # Timing data
     first_interaction: int | None = None
     last_interaction: int | None = None
-    active_hours: set = field(default_factory=set)
+    active_hours_mask: int = 0  # bit h set = active during UTC hour h
 
     # Relationship data
     is_funder: bool = False
@@ -66,7 +80,7 @@ class WalletConnection:
     connected_via: list[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     """Complete analysis result for a wallet."""
     target_address: str
@@ -89,111 +103,136 @@ class AnalysisResult:
 def extract_wallet_interactions(
     transactions: list[dict],
     target_address: str,
-) -> dict[str, WalletConnection]:
+) -> tuple[dict[str, WalletConnection], str | None, int]:
     """
     Extract all wallet interactions from transactions with detailed metadata.
+
+    Returns (connections, funder, active_hours_mask) for the target. The funder
+    is the sender of the earliest incoming SOL transfer from a non-excluded
+    wallet - the strongest signal for wallet connection.
     """
-    connections: dict[str, WalletConnection] = defaultdict(
-        lambda: WalletConnection(address="")
-    )
+    connections: dict[str, WalletConnection] = {}
+    funder = None
+    inf = float("inf")
+    funder_ts = inf
+    hours_mask = 0
+
+    # Locals for the per-transfer loops
+    record = _record_transfer
+    is_excluded = is_excluded_address
+    stable_mints = STABLECOIN_MINT_SET
+    no_transfers = ()
 
     for tx in transactions:
-        timestamp = tx.get("timestamp", 0)
-        fee_payer = tx.get("feePayer", "")
+        tx_get = tx.get
+        # Transactions without a timestamp sort last when picking the funder
+        order_ts = tx_get("timestamp", inf)
+        timestamp = 0 if order_ts is inf else order_ts
+        fee_payer = tx_get("feePayer", "")
 
         # Track hour of activity for timing correlation
+        hour = None
         if timestamp:
             hour = (timestamp // 3600) % 24
+            hours_mask |= 1 << hour
 
         # Process native SOL transfers
-        for transfer in tx.get("nativeTransfers", []):
-            from_addr = transfer.get("fromUserAccount", "")
-            to_addr = transfer.get("toUserAccount", "")
-            amount = transfer.get("amount", 0) / 1e9  # lamports to SOL
+        for transfer in tx_get("nativeTransfers", no_transfers):
+            get = transfer.get
+            from_addr = get("fromUserAccount", "")
+            to_addr = get("toUserAccount", "")
+            lamports = get("amount", 0)
+
+            # Earliest funding transfer wins; ties keep the first seen
+            if (
+                to_addr == target_address
+                and from_addr
+                and lamports > 0
+                and (funder is None or order_ts < funder_ts)
+                and not is_excluded(from_addr)
+            ):
+                funder = from_addr
+                funder_ts = order_ts
 
             if from_addr == target_address and to_addr and to_addr != target_address:
-                conn = connections[to_addr]
-                conn.address = to_addr
-                conn.sent_count += 1
-                conn.sent_sol += amount
-                _update_timing(conn, timestamp, hour if timestamp else None)
-
+                record(connections, to_addr, True, lamports, 0.0, timestamp, hour)
             elif to_addr == target_address and from_addr and from_addr != target_address:
-                conn = connections[from_addr]
-                conn.address = from_addr
-                conn.received_count += 1
-                conn.received_sol += amount
-                _update_timing(conn, timestamp, hour if timestamp else None)
+                record(connections, from_addr, False, lamports, 0.0, timestamp, hour)
 
         # Process token transfers
-        for transfer in tx.get("tokenTransfers", []):
-            from_addr = transfer.get("fromUserAccount", "")
-            to_addr = transfer.get("toUserAccount", "")
-            mint = transfer.get("mint", "")
-            token_amount = transfer.get("tokenAmount", 0)
+        for transfer in tx_get("tokenTransfers", no_transfers):
+            get = transfer.get
+            from_addr = get("fromUserAccount", "")
+            to_addr = get("toUserAccount", "")
 
             # Calculate USD value for stablecoins (1:1 with USD)
             usd_value = 0.0
-            if mint in STABLECOIN_MINTS:
-                usd_value = float(token_amount) if token_amount else 0.0
+            if get("mint", "") in stable_mints:
+                token_amount = get("tokenAmount", 0)
+                if token_amount:
+                    usd_value = float(token_amount)
 
             if from_addr == target_address and to_addr and to_addr != target_address:
-                conn = connections[to_addr]
-                conn.address = to_addr
-                conn.sent_count += 1
-                conn.sent_usd += usd_value
-                _update_timing(conn, timestamp, hour if timestamp else None)
-
+                record(connections, to_addr, True, 0, usd_value, timestamp, hour)
             elif to_addr == target_address and from_addr and from_addr != target_address:
-                conn = connections[from_addr]
-                conn.address = from_addr
-                conn.received_count += 1
-                conn.received_usd += usd_value
-                _update_timing(conn, timestamp, hour if timestamp else None)
+                record(connections, from_addr, False, 0, usd_value, timestamp, hour)
 
         # Track fee payer relationships
         if fee_payer and fee_payer != target_address:
-            conn = connections[fee_payer]
-            conn.address = fee_payer
+            conn = connections.get(fee_payer)
+            if conn is None:
+                conn = connections[fee_payer] = WalletConnection(address=fee_payer)
             conn.is_fee_payer = True
-            _update_timing(conn, timestamp, hour if timestamp else None)
-
-    # Mark bidirectional connections
+            if timestamp:
+                first = conn.first_interaction
+                if first is None or timestamp < first:
+                    conn.first_interaction = timestamp
+                last = conn.last_interaction
+                if last is None or timestamp > last:
+                    conn.last_interaction = timestamp
+                conn.active_hours_mask |= 1 << hour
+
+    # Convert lamport totals to SOL and mark bidirectional connections
     for conn in connections.values():
+        conn.sent_sol = conn.sent_lamports / 1e9
+        conn.received_sol = conn.received_lamports / 1e9
         if conn.sent_count > 0 and conn.received_count > 0:
             conn.is_bidirectional = True
 
-    return dict(connections)
+    return connections, funder, hours_mask
 
 
-def _update_timing(conn: WalletConnection, timestamp: int, hour: int | None):
-    """Update timing metadata for a connection."""
+def _record_transfer(
+    connections: dict[str, WalletConnection],
+    counterparty: str,
+    sent: bool,
+    lamports: int,
+    usd: float,
+    timestamp: int,
+    hour: int | None,
+):
+    """Add one SOL or token transfer between the target and a counterparty."""
+    conn = connections.get(counterparty)
+    if conn is None:
+        conn = connections[counterparty] = WalletConnection(address=counterparty)
+    if sent:
+        conn.sent_count += 1
+        conn.sent_lamports += lamports
+        conn.sent_usd += usd
+    else:
+        conn.received_count += 1
+        conn.received_lamports += lamports
+        conn.received_usd += usd
+
+    # Timing metadata; hour is only set when timestamp is
     if timestamp:
-        if conn.first_interaction is None or timestamp < conn.first_interaction:
+        first = conn.first_interaction
+        if first is None or timestamp < first:
             conn.first_interaction = timestamp
-        if conn.last_interaction is None or timestamp > conn.last_interaction:
+        last = conn.last_interaction
+        if last is None or timestamp > last:
             conn.last_interaction = timestamp
-    if hour is not None:
-        conn.active_hours.add(hour)
-
-
-def find_funder(transactions: list[dict], target_address: str) -> str | None:
-    """
-    Find the wallet that first funded the target address.
-    This is the strongest signal for wallet connection.
-    """
-    sorted_txs = sorted(transactions, key=lambda x: x.get("timestamp", float("inf")))
-
-    for tx in sorted_txs:
-        for transfer in tx.get("nativeTransfers", []):
-            to_addr = transfer.get("toUserAccount", "")
-            from_addr = transfer.get("fromUserAccount", "")
-            amount = transfer.get("amount", 0)
-
-            if to_addr == target_address and from_addr and amount > 0:
-                if not is_excluded_address(from_addr):
-                    return from_addr
-    return None
+        conn.active_hours_mask |= 1 << hour
 
 
 def find_cex_deposits(transactions: list[dict], target_address: str) -> dict[str, list[str]]:
@@ -201,7 +240,7 @@ def find_cex_deposits(transactions: list[dict], target_address: str) -> dict[str
     Find CEX deposit addresses used by the target.
     If another wallet uses the same deposit address = likely same owner.
     """
-    cex_deposits: dict[str, list[str]] = defaultdict(list)
+    cex_deposits: dict[str, list[str]] = {}
 
     for tx in transactions:
         for transfer in tx.get("nativeTransfers", []):
@@ -211,24 +250,24 @@ def find_cex_deposits(transactions: list[dict], target_address: str) -> dict[str
             if from_addr == target_address and to_addr:
                 cex_name = get_cex_name(to_addr)
                 if cex_name:
-                    cex_deposits[cex_name].append(to_addr)
+                    cex_deposits.setdefault(cex_name, []).append(to_addr)
 
-    return dict(cex_deposits)
+    return cex_deposits
 
 
 def calculate_timing_correlation(
     conn: WalletConnection,
-    target_hours: set[int],
+    target_hours_mask: int,
 ) -> float:
     """
     Calculate timing correlation score.
     Wallets active in the same hours are more likely same owner.
     """
-    if not conn.active_hours or not target_hours:
+    if not conn.active_hours_mask or not target_hours_mask:
         return 0.0
 
-    overlap = len(conn.active_hours & target_hours)
-    total = len(conn.active_hours | target_hours)
+    overlap = (conn.active_hours_mask & target_hours_mask).bit_count()
+    total = (conn.active_hours_mask | target_hours_mask).bit_count()
 
     if total == 0:
         return 0.0
@@ -241,14 +280,11 @@ def has_round_amounts(conn: WalletConnection) -> bool:
     Check if transfers involve round numbers.
     Round number transfers suggest intentional/same-person transfers.
     """
-    round_numbers = [0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000]
-
-    for amount in [conn.sent_sol, conn.received_sol]:
+    for amount in (conn.sent_sol, conn.received_sol):
         if amount > 0:
-            for round_num in round_numbers:
-                if abs(amount - round_num) < 0.001:
-                    return True
-                if round_num > 0 and abs(amount % round_num) < 0.001:
+            for round_num in ROUND_NUMBERS:
+                # Modulo alone misses amounts a hair below the round number
+                if abs(amount - round_num) < 0.001 or amount % round_num < 0.001:
                     return True
     return False
 
@@ -256,7 +292,7 @@ def has_round_amounts(conn: WalletConnection) -> bool:
 def score_connection(
     conn: WalletConnection,
     funder: str | None,
-    target_hours: set[int],
+    target_hours_mask: int,
     target_counterparties: set[str],
 ) -> float:
     """
@@ -303,7 +339,7 @@ def score_connection(
         signals.append("LARGE_XFER")
 
     # TIMING CORRELATION
-    timing_score = calculate_timing_correlation(conn, target_hours)
+    timing_score = calculate_timing_correlation(conn, target_hours_mask)
     if timing_score > 0.5:
         score += SCORES["TIMING_CORRELATION"]
         signals.append("TIMING")
@@ -340,18 +376,18 @@ def get_total_usd_value(conn: WalletConnection, sol_price: float = 200.0) -> flo
     return sol_value + stable_value
 
 
-def is_spam_connection(conn: WalletConnection) -> bool:
+def is_spam_connection(conn: WalletConnection, total_value: float | None = None) -> bool:
     """
     Check if a connection is likely spam/dust.
+    Pass `total_value` when get_total_usd_value(conn) is already known.
 
     Spam indicators:
     - Very small total value (dust attacks)
     - Only received (never sent) - likely airdrop spam
     - No meaningful SOL/stablecoin transfer
     """
-    total_sol = conn.sent_sol + conn.received_sol
-    total_usd = conn.sent_usd + conn.received_usd
-    total_value = get_total_usd_value(conn)
+    if total_value is None:
+        total_value = get_total_usd_value(conn)
 
     # If total value is below $10, it's likely spam
     if total_value < 10.0:
@@ -398,18 +434,8 @@ def filter_spam_connections(
     filtered = {}
 
     for addr, conn in connections.items():
-        # Always keep the funder
-        if funder and addr == funder:
-            filtered[addr] = conn
-            continue
-
-        # Always keep fee payers
-        if conn.is_fee_payer:
-            filtered[addr] = conn
-            continue
-
-        # Always keep bidirectional connections
-        if conn.is_bidirectional:
+        # Always keep the funder, fee payers and bidirectional connections
+        if (funder and addr == funder) or conn.is_fee_payer or conn.is_bidirectional:
             filtered[addr] = conn
             continue
 
@@ -419,44 +445,37 @@ def filter_spam_connections(
             filtered[addr] = conn
             continue
 
-        # Check if it's not spam (for edge cases)
-        if not is_spam_connection(conn):
-            # Even if not spam, still require some minimum value
-            if total_value >= 10.0:  # At least $10
-                filtered[addr] = conn
-                continue
+        # Below the threshold, keep it unless it looks like spam (dust is < $10)
+        if not is_spam_connection(conn, total_value):
+            filtered[addr] = conn
 
     return filtered
 
 
-async def analyze_hop2_wallet(
+def analyze_hop2_wallet(
     wallet_addr: str,
-    wallet_score: float,
+    transactions: list[dict],
     target_address: str,
     target_counterparties: set[str],
     funder: str | None,
+    direct_addrs: frozenset[str] = frozenset(),
 ) -> tuple[str, dict[str, WalletConnection]]:
-    """Analyze a hop-1 wallet's connections for hop-2 analysis."""
+    """
+    Analyze a hop-1 wallet's already-fetched transactions for hop-2 analysis.
+    Addresses in direct_addrs are already hop-1 connections and are skipped.
+    """
     try:
-        transactions = await helius_client.get_transaction_history(
-            wallet_addr,
-            limit=HOP2_TRANSACTION_LIMIT,
-        )
-        connections = extract_wallet_interactions(transactions, wallet_addr)
-        filtered = filter_addresses(
-            {addr: {"label": ""} for addr in connections.keys()}
+        connections, hop1_funder, _ = extract_wallet_interactions(
+            transactions, wallet_addr
         )
+        allowed = filter_addresses_set(connections.keys() - direct_addrs)
+        allowed.discard(target_address)
 
         # Keep only filtered connections
         hop2_connections = {
-            addr: connections[addr]
-            for addr in filtered.keys()
-            if addr != target_address and addr in connections
+            addr: conn for addr, conn in connections.items() if addr in allowed
         }
 
-        # Check if this wallet shares the same funder
-        hop1_funder = find_funder(transactions, wallet_addr)
-
         # Filter out spam/dust from hop2 connections
         hop2_connections = filter_spam_connections(hop2_connections, hop1_funder)
 
@@ -478,12 +497,85 @@ async def analyze_hop2_wallet(
         return wallet_addr, hop2_connections
 
     except Exception:
+        logger.debug("Hop-2 analysis failed for %s", wallet_addr, exc_info=True)
         return wallet_addr, {}
 
 
-async def analyze_wallet(address: str) -> AnalysisResult:
+# Progress updates still running, referenced so they aren't garbage collected
+_progress_tasks: set[asyncio.Task] = set()
+
+
+def _report_progress(progress_cb: Callable[[str], Awaitable[Any]], stage: str):
+    """Run a progress callback in the background, logging any failure."""
+    task = asyncio.create_task(progress_cb(stage))
+    _progress_tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        _progress_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.debug("Progress update failed: %r", t.exception())
+
+    task.add_done_callback(_done)
+
+
+async def fetch_and_analyze_hop2_wallet(
+    wallet_addr: str,
+    target_address: str,
+    target_counterparties: set[str],
+    funder: str | None,
+    direct_addrs: frozenset[str] = frozenset(),
+) -> tuple[str, dict[str, WalletConnection]]:
+    """
+    Fetch a hop-1 wallet's recent transactions and run analyze_hop2_wallet on them.
+    The pure-CPU analysis runs in a worker thread so the event loop keeps
+    serving other chats meanwhile.
+    """
+    try:
+        transactions = await helius_client.get_transaction_history(
+            wallet_addr,
+            limit=HOP2_TRANSACTION_LIMIT,
+        )
+    except Exception as e:
+        logger.debug("Hop-2 fetch failed for %s: %r", wallet_addr, e)
+        return wallet_addr, {}
+
+    return await asyncio.to_thread(
+        analyze_hop2_wallet,
+        wallet_addr,
+        transactions,
+        target_address,
+        target_counterparties,
+        funder,
+        direct_addrs,
+    )
+
+
+def _merge_hop2_connections(
+    aggregated: dict[str, WalletConnection],
+    hop2_conns: dict[str, WalletConnection],
+):
+    """Fold one hop-1 wallet's hop-2 connections into the aggregate."""
+    for addr, conn in hop2_conns.items():
+        existing = aggregated.get(addr)
+        if existing is None:
+            aggregated[addr] = conn
+        else:
+            existing.score += conn.score * 0.5
+            existing.connected_via.extend(conn.connected_via)
+            existing.common_counterparties = max(
+                existing.common_counterparties,
+                conn.common_counterparties,
+            )
+
+
+async def analyze_wallet(
+    address: str,
+    progress_cb: Callable[[str], Awaitable[Any]] | None = None,
+) -> AnalysisResult:
     """
     Comprehensive wallet analysis with multi-hop clustering.
+    If given, progress_cb is started once before the slow hop-2 phase; it runs
+    in the background so a slow status update never delays the analysis.
     """
     result = AnalysisResult(
         target_address=address,
@@ -512,18 +604,17 @@ async def analyze_wallet(address: str) -> AnalysisResult:
     # =========================================================================
     # PHASE 2: Extract direct connections
     # =========================================================================
-    connections = extract_wallet_interactions(transactions, address)
-
-    # Find the funder (highest priority signal)
-    funder = find_funder(transactions, address)
+    # Also yields the funder (highest priority signal) and the target's
+    # active hours for timing correlation
+    connections, funder, target_hours_mask = extract_wallet_interactions(
+        transactions, address
+    )
     result.funder = funder
 
-    # Get target's active hours for timing correlation
-    target_hours: set[int] = set()
-    for tx in transactions:
-        ts = tx.get("timestamp", 0)
-        if ts:
-            target_hours.add((ts // 3600) % 24)
+    # Everything needed from the raw transactions has been extracted; drop the
+    # paginated list so only the client's size-bounded history cache (latest
+    # page per address) can keep parsed JSON alive through the phases below
+    del transactions
 
     # Get target's counterparties for common counterparty analysis
     target_counterparties = set(connections.keys())
@@ -539,11 +630,13 @@ async def analyze_wallet(address: str) -> AnalysisResult:
             funder_txs = await helius_client.get_all_transaction_history(
                 funder, max_transactions=200
             )
-            funder_of_funder = find_funder(funder_txs, funder)
+            funder_connections, funder_of_funder, _ = extract_wallet_interactions(
+                funder_txs, funder
+            )
+            del funder_txs
             result.funder_of_funder = funder_of_funder
 
             # Find other wallets funded by the same funder (with minimum threshold)
-            funder_connections = extract_wallet_interactions(funder_txs, funder)
             for addr, conn in funder_connections.items():
                 # Only include if sent meaningful amount (not dust)
                 if conn.sent_count > 0 and conn.sent_sol >= MIN_SOL_THRESHOLD:
@@ -552,19 +645,15 @@ async def analyze_wallet(address: str) -> AnalysisResult:
 
             result.same_funder_cluster = funder_siblings[:10]
         except Exception:
-            pass
+            logger.debug("Funder lookup failed for %s", funder, exc_info=True)
 
     # =========================================================================
     # PHASE 4: Score and filter direct connections
     # =========================================================================
     # First filter out known programs/exchanges/etc
-    filtered_addrs = filter_addresses(
-        {addr: {"label": ""} for addr in connections.keys()}
-    )
+    allowed = filter_addresses_set(connections)
     filtered_connections = {
-        addr: connections[addr]
-        for addr in filtered_addrs.keys()
-        if addr in connections
+        addr: conn for addr, conn in connections.items() if addr in allowed
     }
 
     # Then filter out spam/dust connections
@@ -577,74 +666,167 @@ async def analyze_wallet(address: str) -> AnalysisResult:
             conn.score += SCORES["SAME_FUNDER"]
             conn.signals.append("SAME_FUNDER")
 
-        score_connection(conn, funder, target_hours, target_counterparties)
+        score_connection(conn, funder, target_hours_mask, target_counterparties)
 
-    # Sort by score
-    scored_connections = sorted(
+    # Top connections by score (nlargest keeps sorted()'s order for ties)
+    scored_connections = heapq.nlargest(
+        max(MAX_HOP1_WALLETS, MAX_HOP2_WALLETS),
         filtered_connections.values(),
-        key=lambda x: x.score,
-        reverse=True,
+        key=attrgetter("score"),
     )
 
     result.direct_connections = scored_connections[:MAX_HOP1_WALLETS]
 
     # Track bidirectional cluster
     result.bidirectional_cluster = [
-        conn.address for conn in scored_connections if conn.is_bidirectional
-    ][:10]
+        conn.address
+        for conn in heapq.nlargest(
+            10,
+            (conn for conn in filtered_connections.values() if conn.is_bidirectional),
+            key=attrgetter("score"),
+        )
+    ]
 
     # =========================================================================
     # PHASE 5: Hop-2 Analysis
     # =========================================================================
+    if progress_cb:
+        _report_progress(progress_cb, "Processing hop-2 connections...")
+
     top_wallets = [conn.address for conn in scored_connections[:MAX_HOP2_WALLETS]]
+    direct_addrs = frozenset(filtered_connections)
 
+    position = {wallet_addr: i for i, wallet_addr in enumerate(top_wallets)}
     hop2_tasks = [
-        analyze_hop2_wallet(
+        asyncio.create_task(fetch_and_analyze_hop2_wallet(
             wallet_addr,
-            filtered_connections.get(wallet_addr, WalletConnection(address=wallet_addr)).score,
             address,
             target_counterparties,
             funder,
-        )
+            direct_addrs,
+        ))
         for wallet_addr in top_wallets
     ]
 
-    hop2_results = await asyncio.gather(*hop2_tasks, return_exceptions=True)
-
-    # Aggregate hop-2 connections
+    # Aggregate hop-2 connections while the remaining wallets are still being
+    # fetched. Results are merged in top_wallets order regardless of which
+    # finishes first, so score ties and connected_via order stay deterministic.
     hop2_aggregated: dict[str, WalletConnection] = {}
+    finished: dict[int, dict[str, WalletConnection]] = {}
+    next_index = 0
 
-    for res in hop2_results:
-        if isinstance(res, Exception):
-            continue
-        via_wallet, hop2_conns = res
-        for addr, conn in hop2_conns.items():
-            if addr in filtered_connections:
-                continue  # Skip if already a direct connection
-
-            if addr not in hop2_aggregated:
-                hop2_aggregated[addr] = conn
-            else:
-                existing = hop2_aggregated[addr]
-                existing.score += conn.score * 0.5
-                existing.connected_via.extend(conn.connected_via)
-                existing.common_counterparties = max(
-                    existing.common_counterparties,
-                    conn.common_counterparties,
-                )
-
-    # Score and sort hop-2 connections
-    sorted_hop2 = sorted(
+    try:
+        for next_done in asyncio.as_completed(hop2_tasks):
+            via_wallet, hop2_conns = await next_done
+            finished[position[via_wallet]] = hop2_conns
+            while next_index in finished:
+                _merge_hop2_connections(hop2_aggregated, finished.pop(next_index))
+                next_index += 1
+    finally:
+        # Don't leave fetches running if this analysis is cancelled
+        for task in hop2_tasks:
+            task.cancel()
+
+    # Keep the top-scoring hop-2 connections
+    result.hop2_connections = heapq.nlargest(
+        20,
         hop2_aggregated.values(),
-        key=lambda x: x.score,
-        reverse=True,
+        key=attrgetter("score"),
     )
 
-    result.hop2_connections = sorted_hop2[:20]
-
     return result
 
 
+# Finished analyses by address: address -> (expires_at, result)
+_analysis_cache: OrderedDict[str, tuple[float, AnalysisResult]] = OrderedDict()
+
+
+@dataclass
+class _InflightAnalysis:
+    """A running analysis and the progress callbacks of everyone awaiting it."""
+    task: asyncio.Task | None = None
+    progress_cbs: list[Callable[[str], Awaitable[Any]]] = field(default_factory=list)
+    stage: str | None = None  # Latest stage reported, replayed to late joiners
+
+    async def report(self, stage: str):
+        """Forward a progress stage to every waiting caller."""
+        self.stage = stage
+        for progress_cb in self.progress_cbs:
+            _report_progress(progress_cb, stage)
+
+    def join(self, progress_cb: Callable[[str], Awaitable[Any]] | None):
+        """Subscribe another caller, catching it up on the latest stage."""
+        if progress_cb is None:
+            return
+        self.progress_cbs.append(progress_cb)
+        if self.stage is not None:
+            _report_progress(progress_cb, self.stage)
+
+
+# Running analyses, so concurrent requests for one address share a single run
+_analysis_inflight: dict[str, _InflightAnalysis] = {}
+
+
+def get_cached_analysis(address: str) -> AnalysisResult | None:
+    """Return a recent analysis result for the address, if still fresh."""
+    entry = _analysis_cache.get(address)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _analysis_cache[address]
+        return None
+    _analysis_cache.move_to_end(address)
+    return entry[1]
+
+
+def is_analysis_running(address: str) -> bool:
+    """Check if an analysis of the address is already in progress."""
+    return address in _analysis_inflight
+
+
+def _cache_analysis(address: str, result: AnalysisResult):
+    """Store a successful analysis result, evicting the oldest entries."""
+    _analysis_cache[address] = (time.monotonic() + ANALYSIS_CACHE_TTL, result)
+    _analysis_cache.move_to_end(address)
+    while len(_analysis_cache) > ANALYSIS_CACHE_SIZE:
+        _analysis_cache.popitem(last=False)
+
+
+async def analyze_wallet_cached(
+    address: str,
+    progress_cb: Callable[[str], Awaitable[Any]] | None = None,
+) -> AnalysisResult:
+    """
+    analyze_wallet with a short-lived result cache.
+    Concurrent calls for the same address await one shared analysis, and
+    each caller's progress_cb receives that analysis' progress stages.
+    """
+    cached = get_cached_analysis(address)
+    if cached is not None:
+        return cached
+
+    inflight = _analysis_inflight.get(address)
+    if inflight is None:
+        inflight = _InflightAnalysis()
+        inflight.task = asyncio.create_task(
+            analyze_wallet(address, progress_cb=inflight.report)
+        )
+        _analysis_inflight[address] = inflight
+
+        def _done(t: asyncio.Task):
+            _analysis_inflight.pop(address, None)
+            if t.cancelled() or t.exception() is not None:
+                return
+            if not t.result().error:
+                _cache_analysis(address, t.result())
+
+        inflight.task.add_done_callback(_done)
+    inflight.join(progress_cb)
+
+    # Shield so one caller giving up doesn't cancel the run for the others
+    return await asyncio.shield(inflight.task)
+
+
 def format_analysis_result(result: AnalysisResult) -> dict:
     """Convert analysis result to dictionary for JSON serialization."""
     if result.error: